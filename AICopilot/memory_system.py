@@ -1,14 +1,195 @@
 # AI Memory System - The Brain of the Copilot
 # Stores, learns, and recalls design patterns
 
+import functools
 import json
 import sqlite3
+import sys
+import threading
+import time
+import uuid
+import weakref
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from contextlib import contextmanager
+from itertools import groupby
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Final, Optional
 import hashlib
 from pathlib import Path
 
+# Operation parameters/context are stored as UTF-8 JSON bytes; orjson is
+# used when installed. Rows written as text by older versions decode the same.
+# The encoder is bound once: orjson through a C-level partial, stdlib json
+# through one reusable encoder (json.dumps builds a new one per call when
+# separators are given).
+try:
+    import orjson
+    
+    _dumps = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+    _loads = orjson.loads
+except ImportError:
+    _json_encode = json.JSONEncoder(separators=(",", ":")).encode
+    
+    def _dumps(obj) -> bytes:
+        return _json_encode(obj).encode()
+        
+    _loads = json.loads
+
+# Sentence embedding model used for semantic recall of design sessions
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Above this many sessions, search an HNSW graph instead of a flat scan
+HNSW_THRESHOLD = 10000
+# Pending operations are written once this many queue up or this many
+# seconds pass, whichever comes first
+FLUSH_MAX_PENDING = 50
+FLUSH_INTERVAL = 0.1
+
+# Hot-path statements, kept as constants so they always hit the
+# connection's prepared statement cache
+INSERT_OPERATION_SQL: Final[str] = """
+    INSERT INTO operations
+    (session_id, operation_type, parameters, context, timestamp, was_successful, time_taken)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Pattern detection looks at every 3-operation window over the last
+# 20 operations each time one is stored
+PATTERN_LENGTH = 3
+PATTERN_HISTORY = 20
+
+HISTORY_SQL: Final[str] = """
+    SELECT operation_type, time_taken, was_successful
+    FROM operations
+    WHERE session_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+
+# Patterns are keyed by a 64-bit hash folded from per-operation hashes;
+# pattern_name and operation_sequence are kept for display and prefix lookup
+PATTERN_HASH_ROTATION = 21
+
+UPSERT_PATTERN_SQL: Final[str] = """
+    INSERT INTO patterns (pattern_hash, pattern_name, operation_sequence, frequency, success_rate, avg_time, last_used)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(pattern_hash) DO UPDATE
+    SET frequency = frequency + excluded.frequency, last_used = excluded.last_used
+"""
+
+RECENT_OPERATIONS_SQL: Final[str] = """
+    SELECT operation_type
+    FROM operations
+    WHERE session_id = ?
+    ORDER BY timestamp DESC
+    LIMIT 2
+"""
+
+NEXT_PATTERN_SQL: Final[str] = """
+    SELECT pattern_name, success_rate, avg_time
+    FROM patterns
+    WHERE pattern_name LIKE ?
+    ORDER BY frequency DESC
+    LIMIT 1
+"""
+
+# Timestamp columns hold integer microseconds since the epoch
+TIMESTAMP_COLUMNS = (
+    ("design_sessions", "created_at"),
+    ("design_sessions", "last_accessed"),
+    ("operations", "timestamp"),
+    ("patterns", "last_used"),
+    ("preferences", "learned_at"),
+)
+
+# Embedding model: None until loaded, False if it can't be
+_encoder = None
+_encoder_thread = None
+_encoder_lock = threading.Lock()
+
+
+def _now_us() -> int:
+    """Current time in microseconds since the epoch"""
+    return time.time_ns() // 1000
+
+
+def _timestamp_text(value):
+    """Local-time text for a stored timestamp, as older versions returned"""
+    if isinstance(value, int):
+        seconds, micros = divmod(value, 1_000_000)
+        return str(datetime.fromtimestamp(seconds).replace(microsecond=micros))
+    return value
+
+
+def _rotl64(values: np.ndarray, bits: int) -> np.ndarray:
+    """Rotate uint64 values left by bits (0 < bits < 64)"""
+    return (values << np.uint64(bits)) | (values >> np.uint64(64 - bits))
+
+
+def _synchronized(method):
+    """Serialize calls that use the write connection"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _load_encoder():
+    """Import and load the embedding model (may download it)"""
+    global _encoder
+    try:
+        from sentence_transformers import SentenceTransformer
+        _encoder = SentenceTransformer(EMBEDDING_MODEL)
+    except Exception:
+        # Not installed, or the model could not be loaded/downloaded
+        _encoder = False
+
+
+def _get_encoder():
+    """The embedding model, or None while loading or if unavailable
+    
+    The first call starts loading it on a background thread, so importing
+    and downloading the model never blocks FreeCAD's GUI thread; recall
+    falls back to text search until it is ready.
+    """
+    global _encoder_thread
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder_thread is None:
+                _encoder_thread = threading.Thread(
+                    target=_load_encoder, name="AICopilot-embeddings", daemon=True
+                )
+                _encoder_thread.start()
+    return _encoder or None
+
+
+def _report_error(message: str):
+    """Report to the FreeCAD console, or stderr outside FreeCAD"""
+    try:
+        import FreeCAD
+        FreeCAD.Console.PrintError(message)
+    except ImportError:
+        sys.stderr.write(message)
+
+
+def _quantize(vectors: np.ndarray):
+    """Symmetric int8 quantization with one float32 scale per row"""
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _get_faiss():
+    """Import faiss on first use; None if unavailable"""
+    try:
+        import faiss
+        return faiss
+    except ImportError:
+        return None
+
+
 class CADMemorySystem:
     """Intelligent memory for CAD operations"""
     
@@ -21,12 +202,80 @@ class CADMemorySystem:
             db_path = config_dir / "memory.db"
             
         self.db_path = db_path
-        self.conn = sqlite3.connect(str(db_path))
+        # All writes go through one connection under _lock (FreeCAD observers
+        # and the flush timer may call in from other threads); reads use a
+        # connection per thread so they run alongside writes under WAL
+        self.conn = self._connect()
+        self._cursor = self.conn.cursor()
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = []
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._flush_timer = None
+        self._embedding_ids = None
+        self._embeddings = None
+        self._embedding_scales = None
+        self._vector_index = None
+        self._op_hashes = {}
+        # suggest_next_operation state: the session's last two operation
+        # types (newest first) and the best pattern per pair, dropped
+        # whenever patterns change
+        self._recent_session = None
+        self._recent_ops = []
+        self._suggest_cache = {}
         self._init_database()
         
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the per-connection settings applied"""
+        # Autocommit mode; multi-statement writes use _transaction()
+        conn = sqlite3.connect(
+            str(self.db_path), cached_statements=256, isolation_level=None,
+            check_same_thread=False
+        )
+        # synchronous=NORMAL drops the fsync on every commit (still safe in WAL)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-8000")  # ~8 MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+        
+    @contextmanager
+    def _reading(self):
+        """Cursor for reads: this thread's read connection
+        
+        An in-memory database only exists on the write connection; its
+        cursor is shared with writers, so it is held under _lock.
+        """
+        if str(self.db_path) == ":memory:":
+            with self._lock:
+                yield self._cursor
+            return
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            conn = self._connect()
+            with self._lock:
+                self._readers.append(conn)
+            # Closed when the thread is gone; FreeCAD serves each socket
+            # client on its own short-lived thread
+            weakref.finalize(threading.current_thread(), self._close_reader, conn)
+            cursor = self._local.cursor = conn.cursor()
+        yield cursor
+        
+    def _close_reader(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._readers:
+                self._readers.remove(conn)
+        conn.close()
+        
     def _init_database(self):
         """Initialize database schema"""
-        cursor = self.conn.cursor()
+        # WAL lets readers run alongside the writes. The accepted mode is
+        # read back: in-memory databases keep "memory".
+        self.journal_mode = self.conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        
+        cursor = self._cursor
         
         # Design sessions table
         cursor.execute("""
@@ -37,9 +286,23 @@ class CADMemorySystem:
                 created_at TIMESTAMP,
                 last_accessed TIMESTAMP,
                 tags TEXT,
-                embeddings BLOB
+                embeddings BLOB,
+                embedding_scale REAL
             )
         """)
+        cursor.execute("PRAGMA table_info(design_sessions)")
+        if "embedding_scale" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE design_sessions ADD COLUMN embedding_scale REAL")
+        # A session whose text changes is re-embedded on the next recall
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS design_sessions_embedding_reset
+            AFTER UPDATE OF description, tags ON design_sessions
+            WHEN old.description IS NOT new.description OR old.tags IS NOT new.tags
+            BEGIN
+                UPDATE design_sessions SET embeddings = NULL, embedding_scale = NULL
+                WHERE id = new.id;
+            END
+        """)
         
         # Operations table
         cursor.execute("""
@@ -47,8 +310,8 @@ class CADMemorySystem:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_id TEXT,
                 operation_type TEXT,
-                parameters TEXT,
-                context TEXT,
+                parameters BLOB,
+                context BLOB,
                 timestamp TIMESTAMP,
                 was_successful BOOLEAN,
                 was_undone BOOLEAN,
@@ -66,10 +329,27 @@ class CADMemorySystem:
                 frequency INTEGER,
                 success_rate REAL,
                 avg_time REAL,
-                last_used TIMESTAMP
+                last_used TIMESTAMP,
+                pattern_hash INTEGER
             )
         """)
         
+        # Patterns are keyed by pattern_hash. Names are only for display and
+        # prefix lookup and may repeat (an operation type can contain "->"),
+        # so drop the unique name index earlier versions created
+        cursor.execute("PRAGMA index_list(patterns)")
+        if any(row[1] == "idx_patterns_name" and row[2] for row in cursor.fetchall()):
+            cursor.execute("DROP INDEX idx_patterns_name")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_patterns_name ON patterns(pattern_name)
+        """)
+            
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_patterns_hash'
+        """)
+        if not cursor.fetchone():
+            self._migrate_pattern_hashes(cursor)
+        
         # User preferences table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS preferences (
@@ -81,170 +361,559 @@ class CADMemorySystem:
             )
         """)
         
-        self.conn.commit()
+        # One row per preference type (older versions appended a row per
+        # call); keep the most recently learned value
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_preferences_type'
+        """)
+        if not cursor.fetchone():
+            cursor.execute("""
+                DELETE FROM preferences
+                WHERE id NOT IN (SELECT MAX(id) FROM preferences GROUP BY preference_type)
+            """)
+            cursor.execute("""
+                CREATE UNIQUE INDEX idx_preferences_type ON preferences(preference_type)
+            """)
+        
+        # Indexes for the session/timestamp and frequency-ordered lookups
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ops_session_time
+            ON operations(session_id, timestamp DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_patterns_freq ON patterns(frequency DESC)
+        """)
+        
+        self.has_fts = self._init_fts(cursor)
+        
+        if cursor.execute("PRAGMA user_version").fetchone()[0] < 1:
+            self._migrate_timestamps(cursor)
+            cursor.execute("PRAGMA user_version = 1")
+        
+    def _migrate_timestamps(self, cursor):
+        """Convert text timestamps written by older versions to integers"""
+        with self._transaction():
+            for table, column in TIMESTAMP_COLUMNS:
+                cursor.execute(f"""
+                    SELECT id, {column} FROM {table} WHERE typeof({column}) = 'text'
+                """)
+                updates = []
+                for row_id, text in cursor.fetchall():
+                    try:
+                        value = datetime.fromisoformat(text)
+                    except ValueError:
+                        continue
+                    seconds = int(value.replace(microsecond=0).timestamp())
+                    updates.append((seconds * 1_000_000 + value.microsecond, row_id))
+                cursor.executemany(f"""
+                    UPDATE {table} SET {column} = ? WHERE id = ?
+                """, updates)
+        
+    def _migrate_pattern_hashes(self, cursor):
+        """Add and backfill pattern_hash on databases from older versions"""
+        cursor.execute("PRAGMA table_info(patterns)")
+        if "pattern_hash" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE patterns ADD COLUMN pattern_hash INTEGER")
+            
+        cursor.execute("SELECT id, operation_sequence FROM patterns WHERE pattern_hash IS NULL")
+        rows = cursor.fetchall()
+        if rows:
+            cursor.executemany("UPDATE patterns SET pattern_hash = ? WHERE id = ?", [
+                (int(self._pattern_hashes(json.loads(row[1])[::-1])[0]), row[0])
+                for row in rows
+            ])
+        # Fold duplicates left by older versions before enforcing uniqueness
+        cursor.execute("""
+            DELETE FROM patterns
+            WHERE id NOT IN (SELECT MIN(id) FROM patterns GROUP BY pattern_hash)
+        """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX idx_patterns_hash ON patterns(pattern_hash)
+        """)
+        
+    def _op_hash(self, op_type: str) -> int:
+        """32-bit hash of an operation type, computed once per type"""
+        value = self._op_hashes.get(op_type)
+        if value is None:
+            value = int.from_bytes(
+                hashlib.blake2b(op_type.encode(), digest_size=4).digest(), "little"
+            )
+            self._op_hashes[op_type] = value
+        return value
+        
+    def _pattern_hashes(self, types: List[str]) -> np.ndarray:
+        """Hash of every window of types (oldest first), as signed 64-bit
+        
+        Each operation's hash is rotated by its position from the newest
+        one and XORed in, so the order of the operations matters.
+        """
+        hashes = np.fromiter(
+            (self._op_hash(op_type) for op_type in types), dtype=np.uint64, count=len(types)
+        )
+        newest = len(types) - PATTERN_LENGTH + 1
+        folded = hashes[PATTERN_LENGTH - 1:].copy()
+        for position in range(1, PATTERN_LENGTH):
+            start = PATTERN_LENGTH - 1 - position
+            folded ^= _rotl64(hashes[start:start + newest], PATTERN_HASH_ROTATION * position)
+        # SQLite integers are signed
+        return folded.view(np.int64)
+        
+    def _init_fts(self, cursor) -> bool:
+        """Create the full-text index over session descriptions and tags"""
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master WHERE name = 'design_sessions_fts'
+        """)
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS design_sessions_fts
+                USING fts5(description, tags, content='design_sessions', content_rowid='id')
+            """)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 - recall falls back to LIKE
+            return False
+            
+        # Keep the external-content index in sync with design_sessions
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS design_sessions_fts_insert
+            AFTER INSERT ON design_sessions BEGIN
+                INSERT INTO design_sessions_fts(rowid, description, tags)
+                VALUES (new.id, new.description, new.tags);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS design_sessions_fts_delete
+            AFTER DELETE ON design_sessions BEGIN
+                INSERT INTO design_sessions_fts(design_sessions_fts, rowid, description, tags)
+                VALUES ('delete', old.id, old.description, old.tags);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS design_sessions_fts_update
+            AFTER UPDATE OF description, tags ON design_sessions BEGIN
+                INSERT INTO design_sessions_fts(design_sessions_fts, rowid, description, tags)
+                VALUES ('delete', old.id, old.description, old.tags);
+                INSERT INTO design_sessions_fts(rowid, description, tags)
+                VALUES (new.id, new.description, new.tags);
+            END
+        """)
+        
+        if not exists:
+            # Index sessions stored before the FTS table existed
+            cursor.execute("""
+                INSERT INTO design_sessions_fts(design_sessions_fts) VALUES ('rebuild')
+            """)
+        return True
         
+    @_synchronized
     def start_session(self, description: str = "") -> str:
         """Start a new design session"""
-        session_id = hashlib.md5(
-            f"{datetime.now().isoformat()}{description}".encode()
-        ).hexdigest()[:12]
+        # Operations of the previous session go out before it ends
+        self.flush()
+        now = _now_us()
+        # 6-byte digest gives the same 12 hex characters without truncating;
+        # the random bytes keep IDs unique across processes and fast restarts
+        session_id = hashlib.blake2b(
+            f"{now}{description}".encode() + uuid.uuid4().bytes,
+            digest_size=6
+        ).hexdigest()
         
-        cursor = self.conn.cursor()
+        cursor = self._cursor
         cursor.execute("""
             INSERT INTO design_sessions (session_id, description, created_at, last_accessed)
             VALUES (?, ?, ?, ?)
-        """, (session_id, description, datetime.now(), datetime.now()))
+        """, (session_id, description, now, now))
         
-        self.conn.commit()
         self.current_session = session_id
+        self._recent_session = session_id
+        self._recent_ops = []
         return session_id
         
+    @_synchronized
     def store_operation(self, op_type: str, parameters: Dict, context: Dict):
         """Store an operation with full context"""
         if not hasattr(self, 'current_session'):
             self.start_session("Auto-generated session")
             
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO operations 
-            (session_id, operation_type, parameters, context, timestamp, was_successful, time_taken)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            self.current_session,
+        session = self.current_session
+        # Bad values fail this call here rather than the batch it joins
+        duration = context.get("duration") or 0
+        try:
+            duration = float(duration)
+        except (TypeError, ValueError):
+            raise ValueError(f"Operation duration must be a number, got {duration!r}") from None
+        # Queued and written in batches; see flush()
+        self._pending.append((
+            session,
             op_type,
-            json.dumps(parameters),
-            json.dumps(context),
-            datetime.now(),
+            _dumps(parameters),
+            _dumps(context),
+            _now_us(),
             True,  # Assume successful unless marked otherwise
-            context.get("duration", 0)
+            duration
         ))
+        if self._recent_session == session:
+            self._recent_ops = [op_type, *self._recent_ops[:1]]
         
-        self.conn.commit()
+        if (len(self._pending) >= FLUSH_MAX_PENDING
+                or time.monotonic() - self._last_flush > FLUSH_INTERVAL):
+            self.flush()
+        elif self._flush_timer is None:
+            # Make sure a short burst is written even if nothing follows it
+            self._flush_timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+            
+    @_synchronized
+    def flush(self):
+        """Write pending operations and their patterns in one transaction"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+            
+        pending, self._pending = self._pending, []
+        try:
+            self._write_operations(pending)
+        except Exception:
+            # Retry one at a time so only the operations that can't be stored
+            # are lost; retrying the whole batch would fail forever
+            for operation in pending:
+                try:
+                    self._write_operations([operation])
+                except Exception as e:
+                    _report_error(f"AI Copilot memory: dropped {operation[1]!r} operation: {e}\n")
+                    
+    def _write_operations(self, pending: List[tuple]):
+        """Insert operations and upsert their patterns in one transaction"""
+        with self._transaction() as cursor:
+            for session_id, group in groupby(pending, key=lambda op: op[0]):
+                operations = list(group)
+                # Check for patterns (reads the history, so before inserting)
+                patterns = self._detect_patterns(session_id, operations)
+                cursor.executemany(INSERT_OPERATION_SQL, operations)
+                cursor.executemany(UPSERT_PATTERN_SQL, patterns)
+                if patterns:
+                    self._suggest_cache.clear()
+            
+    @_synchronized
+    def close(self):
+        """Flush pending operations and close the database"""
+        self.flush()
+        for conn in self._readers:
+            conn.close()
+        self._readers.clear()
+        self.conn.close()
         
-        # Check for patterns
-        self._detect_and_store_patterns()
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements in one explicit transaction"""
+        self._cursor.execute("BEGIN")
+        try:
+            yield self._cursor
+        except BaseException:
+            self._cursor.execute("ROLLBACK")
+            raise
+        else:
+            self._cursor.execute("COMMIT")
         
+    @_synchronized
     def mark_operation_failed(self, operation_id: int):
         """Mark an operation as failed/undone"""
-        cursor = self.conn.cursor()
+        self.flush()
+        cursor = self._cursor
         cursor.execute("""
             UPDATE operations 
             SET was_undone = TRUE, was_successful = FALSE
             WHERE id = ?
         """, (operation_id,))
-        self.conn.commit()
         
     def recall_similar_designs(self, query: str, limit: int = 5) -> List[Dict]:
         """Find similar previous designs"""
-        # Simple keyword matching for now
-        # TODO: Add vector embeddings for semantic search
-        
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT s.*, GROUP_CONCAT(o.operation_type) as operations
-            FROM design_sessions s
-            LEFT JOIN operations o ON s.session_id = o.session_id
-            WHERE s.description LIKE ? OR s.tags LIKE ?
-            GROUP BY s.session_id
-            ORDER BY s.last_accessed DESC
-            LIMIT ?
-        """, (f"%{query}%", f"%{query}%", limit))
+        self.flush()
+        terms = query.split()
+        ranked = self._vector_search(query, limit) if terms else None
+        with self._reading() as cursor:
+            if ranked is not None:
+                placeholders = ",".join("?" * len(ranked))
+                cursor.execute(f"""
+                    SELECT s.session_id, s.description, s.created_at,
+                           GROUP_CONCAT(o.operation_type) AS operations, s.id
+                    FROM design_sessions s
+                    LEFT JOIN operations o ON s.session_id = o.session_id
+                    WHERE s.id IN ({placeholders})
+                    GROUP BY s.session_id
+                """, ranked)
+                rank = {row_id: i for i, row_id in enumerate(ranked)}
+                rows = sorted(cursor.fetchall(), key=lambda row: rank[row[4]])
+            elif self.has_fts and terms:
+                # Prefix-match every term through the full-text index
+                match = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+                cursor.execute("""
+                    SELECT s.session_id, s.description, s.created_at,
+                           GROUP_CONCAT(o.operation_type) AS operations, s.id
+                    FROM design_sessions s
+                    LEFT JOIN operations o ON s.session_id = o.session_id
+                    WHERE s.id IN (
+                        SELECT rowid FROM design_sessions_fts WHERE design_sessions_fts MATCH ?
+                    )
+                    GROUP BY s.session_id
+                    ORDER BY s.last_accessed DESC
+                    LIMIT ?
+                """, (match, limit))
+                rows = cursor.fetchall()
+            else:
+                cursor.execute("""
+                    SELECT s.session_id, s.description, s.created_at,
+                           GROUP_CONCAT(o.operation_type) AS operations, s.id
+                    FROM design_sessions s
+                    LEFT JOIN operations o ON s.session_id = o.session_id
+                    WHERE s.description LIKE ? OR s.tags LIKE ?
+                    GROUP BY s.session_id
+                    ORDER BY s.last_accessed DESC
+                    LIMIT ?
+                """, (f"%{query}%", f"%{query}%", limit))
+                rows = cursor.fetchall()
         
         results = []
-        for row in cursor.fetchall():
+        for row in rows:
             results.append({
-                "session_id": row[1],
-                "description": row[2],
-                "created": row[3],
-                "operations": row[-1].split(",") if row[-1] else []
+                "session_id": row[0],
+                "description": row[1],
+                "created": _timestamp_text(row[2]),
+                "operations": row[3].split(",") if row[3] else []
             })
             
         return results
         
+    @_synchronized
+    def _vector_search(self, query: str, limit: int) -> Optional[List[int]]:
+        """Session ids ranked by semantic similarity; None if unavailable"""
+        if not self._sync_embeddings():
+            return None
+        # Cosine similarity over normalized embeddings
+        query_vec = _get_encoder().encode(
+            [query], normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+        if self._vector_index is not None:
+            _, ids = self._vector_index.search(query_vec, limit)
+            return [int(i) for i in ids[0] if i != -1]
+            
+        # One pass over the int8 matrix, accumulated exactly in int32; the
+        # query's own scale is the same for every row and can be dropped
+        query_q, _ = _quantize(query_vec)
+        dots = np.einsum("ij,j->i", self._embeddings, query_q[0], dtype=np.int32)
+        scores = dots * self._embedding_scales
+        k = min(limit, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return self._embedding_ids[top].tolist()
+        
+    def _sync_embeddings(self) -> bool:
+        """Embed sessions that lack vectors; False if none can be searched
+        
+        Vectors are stored and kept as int8 with a float32 scale per session,
+        in one contiguous (sessions, dim) matrix. Past HNSW_THRESHOLD
+        sessions they are also indexed in an 8-bit HNSW graph when faiss is
+        installed.
+        """
+        encoder = _get_encoder()
+        if encoder is None:
+            return False
+            
+        cursor = self._cursor
+        if self._embeddings is None:
+            self._load_embeddings(cursor)
+                
+        cursor.execute("""
+            SELECT id, description, tags FROM design_sessions
+            WHERE embeddings IS NULL
+        """)
+        pending = cursor.fetchall()
+        if pending:
+            texts = [f"{row[1] or ''} {row[2] or ''}".strip() for row in pending]
+            vectors = encoder.encode(
+                texts, normalize_embeddings=True, convert_to_numpy=True
+            ).astype(np.float32)
+            quantized, scales = _quantize(vectors)
+            with self._transaction():
+                cursor.executemany("""
+                    UPDATE design_sessions SET embeddings = ?, embedding_scale = ? WHERE id = ?
+                """, [
+                    (vec.tobytes(), float(scale), row[0])
+                    for vec, scale, row in zip(quantized, scales, pending)
+                ])
+                
+            ids = np.array([row[0] for row in pending], dtype=np.int64)
+            if self._embeddings is not None:
+                # Drop the old vectors of sessions whose text changed
+                keep = ~np.isin(self._embedding_ids, ids)
+                if not keep.all():
+                    self._embedding_ids = self._embedding_ids[keep]
+                    self._embeddings = self._embeddings[keep]
+                    self._embedding_scales = self._embedding_scales[keep]
+                    # HNSW can't remove entries; rebuilt below
+                    self._vector_index = None
+                    if not len(self._embeddings):
+                        self._embeddings = None
+            if self._embeddings is None:
+                self._embedding_ids, self._embeddings = ids, quantized
+                self._embedding_scales = scales
+            else:
+                self._embedding_ids = np.concatenate([self._embedding_ids, ids])
+                self._embeddings = np.vstack([self._embeddings, quantized])
+                self._embedding_scales = np.concatenate([self._embedding_scales, scales])
+            if self._vector_index is not None:
+                self._vector_index.add_with_ids(vectors, ids)
+                
+        if self._embeddings is None:
+            return False
+            
+        if self._vector_index is None and len(self._embeddings) > HNSW_THRESHOLD:
+            faiss = _get_faiss()
+            if faiss is not None:
+                vectors = self._embeddings * self._embedding_scales[:, None]
+                base = faiss.IndexHNSWSQ(
+                    vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, 32,
+                    faiss.METRIC_INNER_PRODUCT
+                )
+                self._vector_index = faiss.IndexIDMap(base)
+                self._vector_index.train(vectors)
+                self._vector_index.add_with_ids(vectors, self._embedding_ids)
+                
+        return True
+        
+    def _load_embeddings(self, cursor):
+        """Read stored embeddings into the in-memory matrix"""
+        cursor.execute("""
+            SELECT id, embeddings, embedding_scale FROM design_sessions
+            WHERE embeddings IS NOT NULL
+        """)
+        rows = cursor.fetchall()
+        if not rows:
+            return
+            
+        legacy = [row for row in rows if row[2] is None]
+        if legacy:
+            # float32 vectors from older versions; quantize them once
+            quantized, scales = _quantize(np.vstack([
+                np.frombuffer(row[1], dtype=np.float32) for row in legacy
+            ]))
+            with self._transaction():
+                cursor.executemany("""
+                    UPDATE design_sessions SET embeddings = ?, embedding_scale = ? WHERE id = ?
+                """, [
+                    (vec.tobytes(), float(scale), row[0])
+                    for vec, scale, row in zip(quantized, scales, legacy)
+                ])
+            converted = {
+                row[0]: (vec.tobytes(), float(scale))
+                for vec, scale, row in zip(quantized, scales, legacy)
+            }
+            rows = [(row[0], *converted[row[0]]) if row[2] is None else row for row in rows]
+            
+        self._embedding_ids = np.fromiter(
+            (row[0] for row in rows), dtype=np.int64, count=len(rows)
+        )
+        self._embeddings = np.frombuffer(
+            b"".join(row[1] for row in rows), dtype=np.int8
+        ).reshape(len(rows), -1)
+        self._embedding_scales = np.fromiter(
+            (row[2] for row in rows), dtype=np.float32, count=len(rows)
+        )
+        
     def get_operation_sequence(self, session_id: str) -> List[Dict]:
         """Get full operation sequence for a session"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT operation_type, parameters, context, timestamp
-            FROM operations
-            WHERE session_id = ? AND was_successful = TRUE
-            ORDER BY timestamp
-        """, (session_id,))
+        self.flush()
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT operation_type, parameters, context, timestamp
+                FROM operations
+                WHERE session_id = ? AND was_successful = TRUE
+                ORDER BY timestamp
+            """, (session_id,))
+            rows = cursor.fetchall()
         
         operations = []
-        for row in cursor.fetchall():
+        for row in rows:
             operations.append({
                 "type": row[0],
-                "parameters": json.loads(row[1]),
-                "context": json.loads(row[2]),
-                "timestamp": row[3]
+                "parameters": _loads(row[1]),
+                "context": _loads(row[2]),
+                "timestamp": _timestamp_text(row[3])
             })
             
         return operations
         
-    def _detect_and_store_patterns(self):
-        """Detect patterns in recent operations"""
-        cursor = self.conn.cursor()
+    def _detect_patterns(self, session_id: str, operations: List[tuple]) -> List[tuple]:
+        """Detect patterns in recent operations
         
-        # Get last 20 operations
-        cursor.execute("""
-            SELECT operation_type, parameters, time_taken, was_successful
-            FROM operations
-            WHERE session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 20
-        """, (self.current_session,))
-        
-        recent_ops = cursor.fetchall()
-        
-        if len(recent_ops) >= 3:
-            # Check for sequences of 3 operations
-            for i in range(len(recent_ops) - 2):
-                sequence = [recent_ops[i][0], recent_ops[i+1][0], recent_ops[i+2][0]]
-                sequence_str = "->".join(sequence)
-                
-                # Check if pattern exists
-                cursor.execute("""
-                    SELECT id, frequency FROM patterns
-                    WHERE pattern_name = ?
-                """, (sequence_str,))
-                
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # Update frequency
-                    cursor.execute("""
-                        UPDATE patterns
-                        SET frequency = frequency + 1, last_used = ?
-                        WHERE id = ?
-                    """, (datetime.now(), existing[0]))
-                else:
-                    # Store new pattern
-                    avg_time = sum(op[2] for op in recent_ops[i:i+3]) / 3
-                    success_rate = sum(1 for op in recent_ops[i:i+3] if op[3]) / 3
-                    
-                    cursor.execute("""
-                        INSERT INTO patterns (pattern_name, operation_sequence, frequency, success_rate, avg_time, last_used)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (sequence_str, json.dumps(sequence), 1, success_rate, avg_time, datetime.now()))
-                    
-        self.conn.commit()
+        Returns pattern upsert rows for a batch of not yet stored operations,
+        counting each window once for every operation whose history it falls
+        in, exactly as if the operations had been stored one at a time.
+        """
+        self._cursor.execute(HISTORY_SQL, (session_id, PATTERN_HISTORY - 1))
+        history = self._cursor.fetchall()[::-1]
+        ops = history + [(op[1], op[6], op[5]) for op in operations]
+        n = len(ops)
+        if n < PATTERN_LENGTH:
+            return []
+            
+        types = [op[0] for op in ops]
+        times = np.fromiter((op[1] or 0 for op in ops), dtype=np.float64, count=n)
+        successes = np.fromiter((bool(op[2]) for op in ops), dtype=np.float64, count=n)
+        # Summed newest first, in pattern order, so averages match earlier versions
+        avg_times = sliding_window_view(times[::-1], PATTERN_LENGTH).mean(axis=1)[::-1]
+        success_rates = sliding_window_view(successes[::-1], PATTERN_LENGTH).mean(axis=1)[::-1]
+        
+        # Window j is seen by operations first..last (indices into ops)
+        starts = np.arange(n - PATTERN_LENGTH + 1)
+        first = np.maximum(starts + PATTERN_LENGTH - 1, len(history))
+        last = np.minimum(starts + PATTERN_HISTORY - 1, n - 1)
+        counts = last - first + 1
+        hashes = self._pattern_hashes(types)
+        
+        found = {}
+        for j in np.flatnonzero(counts > 0):
+            key = int(hashes[j])
+            entry = found.get(key)
+            if entry is None:
+                sequence = types[j:j + PATTERN_LENGTH][::-1]  # Newest first
+                found[key] = entry = [
+                    "->".join(sequence), json.dumps(sequence, separators=(",", ":")),
+                    0, 0.0, 0.0, None, first[j]
+                ]
+            entry[2] += int(counts[j])
+            if first[j] == entry[6]:
+                # A new pattern keeps the stats of the newest window seen by
+                # the first operation that finds it
+                entry[3] = float(success_rates[j])
+                entry[4] = float(avg_times[j])
+            entry[5] = operations[last[j] - len(history)][4]
+            
+        return [(key, *entry[:6]) for key, entry in found.items()]
         
     def get_common_patterns(self, min_frequency: int = 3) -> List[Dict]:
         """Get commonly used patterns"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT pattern_name, operation_sequence, frequency, success_rate, avg_time
-            FROM patterns
-            WHERE frequency >= ?
-            ORDER BY frequency DESC
-        """, (min_frequency,))
+        self.flush()
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT pattern_name, operation_sequence, frequency, success_rate, avg_time
+                FROM patterns
+                WHERE frequency >= ?
+                ORDER BY frequency DESC
+            """, (min_frequency,))
+            rows = cursor.fetchall()
         
         patterns = []
-        for row in cursor.fetchall():
+        for row in rows:
             patterns.append({
                 "name": row[0],
-                "sequence": json.loads(row[1]),
+                "sequence": _loads(row[1]),
                 "frequency": row[2],
                 "success_rate": row[3],
                 "avg_time": row[4]
@@ -252,58 +921,60 @@ class CADMemorySystem:
             
         return patterns
         
+    @_synchronized
     def learn_preference(self, pref_type: str, pref_value: str, confidence: float = 1.0):
         """Learn a user preference"""
-        cursor = self.conn.cursor()
+        cursor = self._cursor
         cursor.execute("""
-            INSERT OR REPLACE INTO preferences (preference_type, preference_value, confidence, learned_at)
+            INSERT INTO preferences (preference_type, preference_value, confidence, learned_at)
             VALUES (?, ?, ?, ?)
-        """, (pref_type, pref_value, confidence, datetime.now()))
-        self.conn.commit()
+            ON CONFLICT(preference_type) DO UPDATE
+            SET preference_value = excluded.preference_value,
+                confidence = excluded.confidence,
+                learned_at = excluded.learned_at
+        """, (pref_type, pref_value, confidence, _now_us()))
         
     def get_preferences(self) -> Dict[str, str]:
         """Get learned preferences"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT preference_type, preference_value, confidence
-            FROM preferences
-            WHERE confidence > 0.5
-            ORDER BY confidence DESC
-        """)
+        with self._reading() as cursor:
+            cursor.execute("""
+                SELECT preference_type, preference_value, confidence
+                FROM preferences
+                WHERE confidence > 0.5
+                ORDER BY confidence DESC
+            """)
+            rows = cursor.fetchall()
         
         prefs = {}
-        for row in cursor.fetchall():
+        for row in rows:
             prefs[row[0]] = row[1]
             
         return prefs
         
     def suggest_next_operation(self, current_context: Dict) -> Optional[Dict]:
         """Suggest next operation based on patterns"""
+        self.flush()
         # Get recent operations
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT operation_type
-            FROM operations
-            WHERE session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 2
-        """, (self.current_session,))
-        
-        recent = [row[0] for row in cursor.fetchall()]
+        if self._recent_session == self.current_session:
+            recent = self._recent_ops
+        else:
+            # Session not started here; read it once and track it from now on
+            with self._reading() as cursor:
+                cursor.execute(RECENT_OPERATIONS_SQL, (self.current_session,))
+                recent = [row[0] for row in cursor.fetchall()]
+            self._recent_session, self._recent_ops = self.current_session, recent
         
         if len(recent) >= 2:
             # Look for matching pattern
-            pattern_start = f"{recent[1]}->{recent[0]}->"
-            
-            cursor.execute("""
-                SELECT pattern_name, success_rate, avg_time
-                FROM patterns
-                WHERE pattern_name LIKE ?
-                ORDER BY frequency DESC
-                LIMIT 1
-            """, (f"{pattern_start}%",))
-            
-            match = cursor.fetchone()
+            key = (recent[1], recent[0])
+            try:
+                match = self._suggest_cache[key]
+            except KeyError:
+                pattern_start = f"{recent[1]}->{recent[0]}->"
+                with self._reading() as cursor:
+                    cursor.execute(NEXT_PATTERN_SQL, (f"{pattern_start}%",))
+                    match = self._suggest_cache[key] = cursor.fetchone()
+                
             if match:
                 next_op = match[0].split("->")[-1]
                 return {
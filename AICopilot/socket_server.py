@@ -11,11 +11,29 @@ import time
 import asyncio
 import queue
 import platform
+import struct
+import functools
 from typing import Dict, Any, List, Optional
 from PySide import QtCore
 
 # Platform-specific socket handling
 IS_WINDOWS = platform.system() == "Windows"
+# Windows 10 1803+ also supports Unix sockets; served alongside TCP there
+WINDOWS_SOCKET_PATH = os.path.join(os.environ.get("PROGRAMDATA", "C:\\ProgramData"), "freecad_mcp.sock")
+
+# Messages are framed with a 4-byte big-endian length prefix. Clients that
+# send bare JSON (first byte "{") get bare JSON back, as before.
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 0xFFFFFF  # 16 MiB
+# The top header byte names the payload codec; lengths never reach it, so
+# existing JSON clients send 0. Replies use the codec of their request.
+CODEC_JSON = 0x00
+CODEC_MSGPACK = 0x02
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 # Import our new modal command system
 try:
@@ -203,6 +221,7 @@ class FreeCADSocketServer:
             self.port = None
         
         self.server_socket = None
+        self.unix_server_socket = None
         self.is_running = False
         self.client_connections = []
         
@@ -216,6 +235,100 @@ class FreeCADSocketServer:
         else:
             self.agent = None
             FreeCAD.Console.PrintMessage("Socket server initialized with Universal Selector (agent import failed)\n")
+        
+        # Tool and view_control operation dispatch tables, built once
+        self.tool_handlers = {
+            # Phase 1 smart dispatchers
+            "view_control": self._handle_view_control,
+            "partdesign_operations": self._handle_partdesign_operations,
+            "part_operations": self._handle_part_operations,
+            "execute_python": self._execute_python,
+            # Legacy individual tools (for backward compatibility)
+            "create_box": self._create_box,
+            "create_cylinder": self._create_cylinder,
+            "create_sphere": self._create_sphere,
+            "create_cone": self._create_cone,
+            "create_torus": self._create_torus,
+            "create_wedge": self._create_wedge,
+            # Boolean Operations
+            "fuse_objects": self._fuse_objects,
+            "cut_objects": self._cut_objects,
+            "common_objects": self._common_objects,
+            # Transformations
+            "move_object": self._move_object,
+            "rotate_object": self._rotate_object,
+            "copy_object": self._copy_object,
+            "array_object": self._array_object,
+            # Part Design
+            "create_sketch": self._create_sketch,
+            "pad_sketch": self._pad_sketch,
+            "fillet_edges": self._fillet_edges,
+            # Priority 1: Essential Missing Tools
+            "chamfer_edges": self._chamfer_edges,
+            "draft_faces": self._draft_faces,
+            "hole_wizard": self._hole_wizard,
+            "linear_pattern": self._linear_pattern,
+            "mirror_feature": self._mirror_feature,
+            "revolution": self._revolution,
+            # Priority 2: Professional Features
+            "loft_profiles": self._loft_profiles,
+            "sweep_path": self._sweep_path,
+            "shell_solid": self._shell_solid,
+            "create_rib": self._create_rib,
+            # Priority 3: Advanced Tools
+            "create_helix": self._create_helix,
+            "polar_pattern": self._polar_pattern,
+            "add_thickness": self._add_thickness,
+            # Analysis
+            "measure_distance": self._measure_distance,
+            "get_volume": self._get_volume,
+            "get_bounding_box": self._get_bounding_box,
+            "get_mass_properties": self._get_mass_properties,
+            "get_screenshot": self._get_screenshot_gui_safe,
+            "list_all_objects": self._list_all_objects,
+            "activate_workbench": self._activate_workbench,
+            # GUI Control Tools
+            "run_command": self._run_command,
+            "save_document": self._save_document,
+            "open_document": self._open_document,
+            "set_view": self._set_view_gui_safe,
+            "fit_all": self._fit_all,
+            "select_object": self._select_object,
+            "clear_selection": self._clear_selection,
+            "get_selection": self._get_selection,
+            "hide_object": self._hide_object,
+            "show_object": self._show_object,
+            "delete_object": self._delete_object,
+            "undo": self._undo,
+            "redo": self._redo,
+            "ai_agent": self._ai_agent,
+            "continue_selection": self._continue_selection,
+        }
+        self.view_control_handlers = {
+            # GUI-safe implementation for view operations
+            "screenshot": self._get_screenshot_gui_safe,
+            "set_view": self._set_view_gui_safe,
+            "fit_all": self._fit_all,
+            "zoom_in": functools.partial(self._view_zoom, "zoom_in"),
+            "zoom_out": functools.partial(self._view_zoom, "zoom_out"),
+            # Document operations
+            "save_document": self._save_document,
+            "create_document": self._create_document_gui_safe,
+            "list_objects": self._list_all_objects,
+            # Selection operations
+            "select_object": self._select_object,
+            "clear_selection": self._clear_selection,
+            "get_selection": self._get_selection,
+            # Object visibility
+            "hide_object": self._hide_object,
+            "show_object": self._show_object,
+            "delete_object": self._delete_object,
+            # History operations
+            "undo": self._undo,
+            "redo": self._redo,
+            # Workbench control
+            "activate_workbench": self._activate_workbench,
+        }
             
     def start_server(self):
         """Start the socket server (cross-platform)"""
@@ -254,6 +367,10 @@ class FreeCADSocketServer:
             server_thread = threading.Thread(target=self._server_loop, daemon=True)
             server_thread.start()
             
+            if IS_WINDOWS:
+                # Only once is_running is set, or its accept loop exits at once
+                self._start_windows_unix_socket()
+            
             # Initialize GUI task processor
             QtCore.QTimer.singleShot(100, process_gui_tasks)
             
@@ -264,11 +381,37 @@ class FreeCADSocketServer:
             FreeCAD.Console.PrintError(f"Failed to start socket server: {e}\n")
             return False
             
-    def _server_loop(self):
+    def _start_windows_unix_socket(self):
+        """Also listen on a Unix socket when this Windows build supports it"""
+        if not hasattr(socket, 'AF_UNIX'):
+            return
+        try:
+            if os.path.exists(WINDOWS_SOCKET_PATH):
+                os.remove(WINDOWS_SOCKET_PATH)
+            self.unix_server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.unix_server_socket.bind(WINDOWS_SOCKET_PATH)
+            self.unix_server_socket.listen(5)
+        except OSError as e:
+            FreeCAD.Console.PrintWarning(f"Unix socket unavailable, using TCP only: {e}\n")
+            if self.unix_server_socket:
+                self.unix_server_socket.close()
+            self.unix_server_socket = None
+            return
+            
+        threading.Thread(
+            target=self._server_loop, args=(self.unix_server_socket,), daemon=True
+        ).start()
+        FreeCAD.Console.PrintMessage(f"Socket server also listening on {WINDOWS_SOCKET_PATH} (Unix socket)\n")
+            
+    def _server_loop(self, server_socket=None):
         """Main server loop to accept connections"""
-        while self.is_running and self.server_socket:
+        server_socket = server_socket or self.server_socket
+        while self.is_running and server_socket:
             try:
-                client_socket, _ = self.server_socket.accept()
+                client_socket, _ = server_socket.accept()
+                if client_socket.family == socket.AF_INET:
+                    # Small request/reply messages: don't wait on Nagle/delayed ACK
+                    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 
                 # Handle client in separate thread
                 client_thread = threading.Thread(
@@ -286,20 +429,60 @@ class FreeCADSocketServer:
                 
     def _handle_client(self, client_socket):
         """Handle individual client connections"""
+        buffer = bytearray()
         try:
             while self.is_running:
                 # Receive data
-                data = client_socket.recv(4096)
+                data = client_socket.recv(65536)
                 if not data:
                     break
-                    
-                # Process the command
-                response = self._process_command(data.decode('utf-8'))
-                
-                # Send response
-                if response:
-                    client_socket.send(response.encode('utf-8'))
-                    
+                buffer += data
+                
+                # Handle every complete command received so far
+                while buffer:
+                    if buffer[0] == ord('{'):
+                        # Legacy client: one bare JSON command per read
+                        command, framed, codec = bytes(buffer), False, CODEC_JSON
+                        buffer.clear()
+                    else:
+                        if len(buffer) < FRAME_HEADER.size:
+                            break
+                        (header,) = FRAME_HEADER.unpack_from(buffer)
+                        codec, length = header >> 24, header & MAX_FRAME_SIZE
+                        if codec not in (CODEC_JSON, CODEC_MSGPACK):
+                            # Not a frame we can trust; the stream cannot resync
+                            raise ValueError(f"Unknown frame codec {codec:#04x}")
+                        end = FRAME_HEADER.size + length
+                        if len(buffer) < end:
+                            break
+                        command, framed = bytes(buffer[FRAME_HEADER.size:end]), True
+                        del buffer[:end]
+                        
+                    # Process the command
+                    if codec == CODEC_MSGPACK and msgpack is not None:
+                        payload = self._process_msgpack_command(command)
+                    elif codec == CODEC_MSGPACK:
+                        codec = CODEC_JSON
+                        payload = json.dumps({
+                            "success": False,
+                            "error": "msgpack is not installed in FreeCAD's Python"
+                        }).encode('utf-8')
+                    else:
+                        payload = self._process_command(command.decode('utf-8')).encode('utf-8')
+                        
+                    # Send response
+                    if payload:
+                        if not framed:
+                            client_socket.sendall(payload)
+                            continue
+                        if len(payload) > MAX_FRAME_SIZE:
+                            codec = CODEC_JSON
+                            payload = json.dumps({
+                                "success": False,
+                                "error": f"Response of {len(payload)} bytes exceeds {MAX_FRAME_SIZE}"
+                            }).encode('utf-8')
+                        client_socket.sendall(FRAME_HEADER.pack(codec << 24 | len(payload)) + payload)
+                            
         except Exception as e:
             FreeCAD.Console.PrintError(f"Client handler error: {e}\n")
         finally:
@@ -307,6 +490,22 @@ class FreeCADSocketServer:
             if client_socket in self.client_connections:
                 self.client_connections.remove(client_socket)
                 
+    def _process_msgpack_command(self, data: bytes) -> bytes:
+        """Process a msgpack-encoded command and return a msgpack response"""
+        try:
+            command = msgpack.unpackb(data, raw=False)
+            result = self._execute_tool(command.get('tool'), command.get('args', {}))
+            return msgpack.packb({
+                "success": True,
+                "result": result
+            }, use_bin_type=True)
+            
+        except Exception as e:
+            return msgpack.packb({
+                "success": False,
+                "error": str(e)
+            }, use_bin_type=True)
+            
     def _process_command(self, command_str: str) -> str:
         """Process incoming command and return response"""
         try:
@@ -333,137 +532,10 @@ class FreeCADSocketServer:
             
     def _execute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
         """Execute the requested tool with Phase 1 smart dispatcher support"""
-        
-        # Handle view_control with GUI-safe operations
-        if tool_name == "view_control":
-            return self._handle_view_control(args)
-        
-        # Handle other smart dispatcher tools
-        elif tool_name == "partdesign_operations":
-            return self._handle_partdesign_operations(args)
-        elif tool_name == "part_operations":
-            return self._handle_part_operations(args)
-        elif tool_name == "execute_python":
-            return self._execute_python(args)
-        
-        # Legacy individual tool routing (for backward compatibility)
-        # Map tool names to implementations
-        elif tool_name == "create_box":
-            return self._create_box(args)
-        elif tool_name == "create_cylinder":
-            return self._create_cylinder(args)
-        elif tool_name == "create_sphere":
-            return self._create_sphere(args)
-        elif tool_name == "create_cone":
-            return self._create_cone(args)
-        elif tool_name == "create_torus":
-            return self._create_torus(args)
-        elif tool_name == "create_wedge":
-            return self._create_wedge(args)
-        # Boolean Operations
-        elif tool_name == "fuse_objects":
-            return self._fuse_objects(args)
-        elif tool_name == "cut_objects":
-            return self._cut_objects(args)
-        elif tool_name == "common_objects":
-            return self._common_objects(args)
-        # Transformations
-        elif tool_name == "move_object":
-            return self._move_object(args)
-        elif tool_name == "rotate_object":
-            return self._rotate_object(args)
-        elif tool_name == "copy_object":
-            return self._copy_object(args)
-        elif tool_name == "array_object":
-            return self._array_object(args)
-        # Part Design
-        elif tool_name == "create_sketch":
-            return self._create_sketch(args)
-        elif tool_name == "pad_sketch":
-            return self._pad_sketch(args)
-        elif tool_name == "fillet_edges":
-            return self._fillet_edges(args)
-        # Priority 1: Essential Missing Tools
-        elif tool_name == "chamfer_edges":
-            return self._chamfer_edges(args)
-        elif tool_name == "draft_faces":
-            return self._draft_faces(args)
-        elif tool_name == "hole_wizard":
-            return self._hole_wizard(args)
-        elif tool_name == "linear_pattern":
-            return self._linear_pattern(args)
-        elif tool_name == "mirror_feature":
-            return self._mirror_feature(args)
-        elif tool_name == "revolution":
-            return self._revolution(args)
-        # Priority 2: Professional Features
-        elif tool_name == "loft_profiles":
-            return self._loft_profiles(args)
-        elif tool_name == "sweep_path":
-            return self._sweep_path(args)
-        elif tool_name == "draft_faces":
-            return self._draft_faces(args)
-        elif tool_name == "shell_solid":
-            return self._shell_solid(args)
-        elif tool_name == "create_rib":
-            return self._create_rib(args)
-        # Priority 3: Advanced Tools
-        elif tool_name == "create_helix":
-            return self._create_helix(args)
-        elif tool_name == "polar_pattern":
-            return self._polar_pattern(args)
-        elif tool_name == "add_thickness":
-            return self._add_thickness(args)
-        # Analysis
-        elif tool_name == "measure_distance":
-            return self._measure_distance(args)
-        elif tool_name == "get_volume":
-            return self._get_volume(args)
-        elif tool_name == "get_bounding_box":
-            return self._get_bounding_box(args)
-        elif tool_name == "get_mass_properties":
-            return self._get_mass_properties(args)
-        elif tool_name == "get_screenshot":
-            return self._get_screenshot_gui_safe(args)
-        elif tool_name == "list_all_objects":
-            return self._list_all_objects(args)
-        elif tool_name == "activate_workbench":
-            return self._activate_workbench(args)
-        elif tool_name == "execute_python":
-            return self._execute_python(args)
-        # GUI Control Tools
-        elif tool_name == "run_command":
-            return self._run_command(args)
-        elif tool_name == "save_document":
-            return self._save_document(args)
-        elif tool_name == "open_document":
-            return self._open_document(args)
-        elif tool_name == "set_view":
-            return self._set_view_gui_safe(args)
-        elif tool_name == "fit_all":
-            return self._fit_all(args)
-        elif tool_name == "select_object":
-            return self._select_object(args)
-        elif tool_name == "clear_selection":
-            return self._clear_selection(args)
-        elif tool_name == "get_selection":
-            return self._get_selection(args)
-        elif tool_name == "hide_object":
-            return self._hide_object(args)
-        elif tool_name == "show_object":
-            return self._show_object(args)
-        elif tool_name == "delete_object":
-            return self._delete_object(args)
-        elif tool_name == "undo":
-            return self._undo(args)
-        elif tool_name == "redo":
-            return self._redo(args)
-        elif tool_name == "ai_agent":
-            return self._ai_agent(args)
-        elif tool_name == "continue_selection":
-            return self._continue_selection(args)
-        else:
+        handler = self.tool_handlers.get(tool_name) if isinstance(tool_name, str) else None
+        if handler is None:
             return f"Unknown tool: {tool_name}"
+        return handler(args)
             
     def _create_box(self, args: Dict[str, Any]) -> str:
         """Create a box with specified dimensions"""
@@ -2673,47 +2745,10 @@ class FreeCADSocketServer:
     def _handle_view_control(self, args: Dict[str, Any]) -> str:
         """Smart dispatcher for all view and document control operations"""
         operation = args.get('operation', '')
-        
-        # GUI-safe implementation for view operations
-        if operation == "screenshot":
-            return self._get_screenshot_gui_safe(args)
-        elif operation == "set_view":
-            return self._set_view_gui_safe(args)
-        elif operation == "fit_all":
-            return self._fit_all(args)
-        elif operation in ["zoom_in", "zoom_out"]:
-            return self._view_zoom(operation, args)
-        # Document operations
-        elif operation == "save_document":
-            return self._save_document(args)
-        elif operation == "create_document":
-            return self._create_document_gui_safe(args)
-        elif operation == "list_objects":
-            return self._list_all_objects(args)
-        # Selection operations
-        elif operation == "select_object":
-            return self._select_object(args)
-        elif operation == "clear_selection":
-            return self._clear_selection(args)
-        elif operation == "get_selection":
-            return self._get_selection(args)
-        # Object visibility
-        elif operation == "hide_object":
-            return self._hide_object(args)
-        elif operation == "show_object":
-            return self._show_object(args)
-        elif operation == "delete_object":
-            return self._delete_object(args)
-        # History operations
-        elif operation == "undo":
-            return self._undo(args)
-        elif operation == "redo":
-            return self._redo(args)
-        # Workbench control
-        elif operation == "activate_workbench":
-            return self._activate_workbench(args)
-        else:
+        handler = self.view_control_handlers.get(operation) if isinstance(operation, str) else None
+        if handler is None:
             return f"Unknown view control operation: {operation}"
+        return handler(args)
 
     # ===================================================================
     # PLACEHOLDER IMPLEMENTATIONS FOR MISSING OPERATIONS
@@ -3127,6 +3162,11 @@ class FreeCADSocketServer:
         # Close server socket
         if self.server_socket:
             self.server_socket.close()
+        if self.unix_server_socket:
+            self.unix_server_socket.close()
+            self.unix_server_socket = None
+            if os.path.exists(WINDOWS_SOCKET_PATH):
+                os.remove(WINDOWS_SOCKET_PATH)
             
         # Remove socket file
         if os.path.exists(self.socket_path):
@@ -6,25 +6,70 @@ Tests the new direct FreeCAD command triggering system
 
 import json
 import socket
+import struct
 import time
 
-def send_mcp_command(tool_name, args):
-    """Send command to FreeCAD via MCP bridge"""
-    try:
-        # Connect to MCP bridge socket
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.connect("/tmp/freecad_mcp.sock")
-        
-        # Send command
-        command = json.dumps({"tool": tool_name, "args": args})
-        sock.send(command.encode('utf-8'))
+# 4-byte big-endian length prefix, as used by the FreeCAD socket server
+FRAME_HEADER = struct.Struct(">I")
+
+class MCPClient:
+    """One persistent, length-framed connection to the FreeCAD socket server"""
+    
+    def __init__(self, socket_path="/tmp/freecad_mcp.sock"):
+        self.socket_path = socket_path
+        self.sock = None
         
-        # Receive response
-        response = sock.recv(8192).decode('utf-8')
-        sock.close()
+    def __enter__(self):
+        return self
         
-        return response
+    def __exit__(self, *exc_info):
+        self.close()
         
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+            
+    def call(self, tool_name, args):
+        """Send one command and return the raw JSON response"""
+        # Connect on first use so a missing server surfaces per call
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.sock.connect(self.socket_path)
+            except OSError:
+                self.close()
+                raise
+                
+        try:
+            payload = json.dumps({"tool": tool_name, "args": args}).encode('utf-8')
+            self.sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+            (length,) = FRAME_HEADER.unpack(self._recv_exactly(FRAME_HEADER.size))
+            return self._recv_exactly(length).decode('utf-8')
+        except OSError:
+            # Drop a broken connection; the next call reconnects
+            self.close()
+            raise
+            
+    def _recv_exactly(self, size):
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("Connection closed by FreeCAD")
+            received += count
+        return bytes(data)
+
+def send_mcp_command(tool_name, args, client=None):
+    """Send command to FreeCAD via MCP bridge"""
+    try:
+        if client is not None:
+            return client.call(tool_name, args)
+        with MCPClient() as client:
+            return client.call(tool_name, args)
+            
     except Exception as e:
         return f"Error: {e}"
 
@@ -33,80 +78,81 @@ def test_modal_commands():
     print("🧪 Testing Modal Command Workflow")
     print("=" * 50)
     
-    # Test 1: Fillet command
-    print("\n1️⃣  Testing Fillet Command")
-    print("Command: Add 3mm fillet to Box")
-    
-    response = send_mcp_command("partdesign_operations", {
-        "operation": "fillet",
-        "object_name": "Box", 
-        "radius": 3.0
-    })
-    
-    print("Response:")
-    print(response)
-    
-    # Test 2: Chamfer command  
-    print("\n2️⃣  Testing Chamfer Command")
-    print("Command: Add 2mm chamfer to Cylinder")
-    
-    response = send_mcp_command("partdesign_operations", {
-        "operation": "chamfer",
-        "object_name": "Cylinder",
-        "distance": 2.0
-    })
-    
-    print("Response:")
-    print(response)
-    
-    # Test 3: Hole command
-    print("\n3️⃣  Testing Hole Command")
-    print("Command: Create 6mm hole, 10mm deep")
-    
-    response = send_mcp_command("partdesign_operations", {
-        "operation": "hole",
-        "diameter": 6.0,
-        "depth": 10.0
-    })
-    
-    print("Response:")
-    print(response)
-    
-    # Test 4: Pad command
-    print("\n4️⃣  Testing Pad Command") 
-    print("Command: Pad Sketch with 15mm length")
-    
-    response = send_mcp_command("partdesign_operations", {
-        "operation": "pad",
-        "sketch_name": "Sketch",
-        "length": 15.0
-    })
-    
-    print("Response:")
-    print(response)
-    
-    # Test 5: Python execution command
-    print("\n5️⃣  Testing Python Execution")
-    print("Command: Execute Python code to create sketch")
-    
-    response = send_mcp_command("execute_python", {
-        "code": "print('Sketcher operations have been removed - use execute_python for custom sketch creation')"
-    })
-    
-    print("Response:")
-    print(response)
-    
-    # Test 6: View command
-    print("\n6️⃣  Testing View Command")
-    print("Command: Set isometric view")
-    
-    response = send_mcp_command("view_control", {
-        "operation": "set_view",
-        "view_type": "isometric" 
-    })
-    
-    print("Response:")
-    print(response)
+    with MCPClient() as client:
+        # Test 1: Fillet command
+        print("\n1️⃣  Testing Fillet Command")
+        print("Command: Add 3mm fillet to Box")
+        
+        response = send_mcp_command("partdesign_operations", {
+            "operation": "fillet",
+            "object_name": "Box", 
+            "radius": 3.0
+        }, client)
+        
+        print("Response:")
+        print(response)
+        
+        # Test 2: Chamfer command  
+        print("\n2️⃣  Testing Chamfer Command")
+        print("Command: Add 2mm chamfer to Cylinder")
+        
+        response = send_mcp_command("partdesign_operations", {
+            "operation": "chamfer",
+            "object_name": "Cylinder",
+            "distance": 2.0
+        }, client)
+        
+        print("Response:")
+        print(response)
+        
+        # Test 3: Hole command
+        print("\n3️⃣  Testing Hole Command")
+        print("Command: Create 6mm hole, 10mm deep")
+        
+        response = send_mcp_command("partdesign_operations", {
+            "operation": "hole",
+            "diameter": 6.0,
+            "depth": 10.0
+        }, client)
+        
+        print("Response:")
+        print(response)
+        
+        # Test 4: Pad command
+        print("\n4️⃣  Testing Pad Command") 
+        print("Command: Pad Sketch with 15mm length")
+        
+        response = send_mcp_command("partdesign_operations", {
+            "operation": "pad",
+            "sketch_name": "Sketch",
+            "length": 15.0
+        }, client)
+        
+        print("Response:")
+        print(response)
+        
+        # Test 5: Python execution command
+        print("\n5️⃣  Testing Python Execution")
+        print("Command: Execute Python code to create sketch")
+        
+        response = send_mcp_command("execute_python", {
+            "code": "print('Sketcher operations have been removed - use execute_python for custom sketch creation')"
+        }, client)
+        
+        print("Response:")
+        print(response)
+        
+        # Test 6: View command
+        print("\n6️⃣  Testing View Command")
+        print("Command: Set isometric view")
+        
+        response = send_mcp_command("view_control", {
+            "operation": "set_view",
+            "view_type": "isometric" 
+        }, client)
+        
+        print("Response:")
+        print(response)
     
     print("\n" + "=" * 50)
     print("✅ Modal Command Workflow Tests Complete!")
@@ -5,72 +5,678 @@ Smart dispatchers aligned with FreeCAD workbench structure for optimal Claude Co
 """
 
 import asyncio
+import collections
 import json
 import os
 import sys
 import socket
 import platform
+import time
 from typing import Any
 
+# Commands and replies are UTF-8 JSON bytes; orjson is used when installed
+try:
+    import orjson
+    
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+    
+    def _dumps_indented(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+except ImportError:
+    _json_encode = json.JSONEncoder(separators=(",", ":")).encode
+    
+    def _dumps(obj) -> bytes:
+        return _json_encode(obj).encode('utf-8')
+        
+    _loads = json.loads
+    _dumps_indented = json.JSONEncoder(indent=2).encode
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-async def main():
-    """Run MCP server for FreeCAD integration"""
+try:
+    # Import MCP components with correct API
+    import mcp.server.stdio
+    import mcp.types as types
+    from mcp.server import NotificationOptions, Server
+    from mcp.server.models import InitializationOptions
+except ImportError as e:
+    # MCP import failed - report on stderr only; stdout is the MCP channel
+    print(f"FreeCAD MCP bridge: MCP SDK not available ({e}). Install with: pip install mcp", file=sys.stderr)
+    sys.exit(1)
+
+SERVER_NAME = "freecad"
+SERVER_VERSION = "2.0.0"
+NOTIFICATION_OPTIONS = NotificationOptions()
+
+# Tool definitions are static, so they are built once at import
+BASE_TOOLS = [
+    types.Tool(
+        name="check_freecad_connection",
+        description="Check if FreeCAD is running with AI Copilot workbench",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+        }
+    ),
+    types.Tool(
+        name="test_echo",
+        description="Test tool that echoes back a message",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "message": {
+                    "type": "string",
+                    "description": "Message to echo back"
+                }
+            },
+            "required": ["message"]
+        }
+    )
+]
+
+# Position parameters shared by the dispatcher schemas
+POSITION_PROPERTIES = {
+    "x": {"type": "number", "description": "X position", "default": 0},
+    "y": {"type": "number", "description": "Y position", "default": 0},
+    "z": {"type": "number", "description": "Z position", "default": 0},
+}
+
+# Phase 1 Smart Dispatchers
+SMART_DISPATCHER_TOOLS = [
+    types.Tool(
+        name="partdesign_operations", 
+        description="⚠️ MODIFIES FreeCAD document: Smart dispatcher for parametric features. Operations like fillet/chamfer require edge selection and will permanently modify the 3D model.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "operation": {
+                    "type": "string",
+                    "description": "PartDesign operation to perform",
+                    "enum": [
+                        # Additive features (5)
+                        "pad", "revolution", "loft", "sweep", "additive_pipe",
+                        # Subtractive features (2)
+                        "groove", "subtractive_sweep",
+                        # Dress-up features (2)
+                        "fillet", "chamfer",
+                        # Pattern features (1)
+                        "mirror",
+                        # Hole features (3)
+                        "hole", "counterbore", "countersink"
+                    ]
+                },
+                "sketch_name": {"type": "string", "description": "Sketch name for operations"},
+                "object_name": {"type": "string", "description": "Object name for dress-up operations"},
+                "feature_name": {"type": "string", "description": "Feature name for pattern operations"},
+                # Common parameters
+                "length": {"type": "number", "description": "Length/depth for pad", "default": 10},
+                "radius": {"type": "number", "description": "Radius for fillet/holes", "default": 1},
+                "distance": {"type": "number", "description": "Distance for chamfer", "default": 1},
+                "angle": {"type": "number", "description": "Angle for revolution/draft", "default": 360},
+                "thickness": {"type": "number", "description": "Thickness value", "default": 2},
+                # Pattern parameters
+                "count": {"type": "integer", "description": "Pattern count", "default": 3},
+                "spacing": {"type": "number", "description": "Pattern spacing", "default": 10},
+                "axis": {"type": "string", "description": "Axis for patterns", "enum": ["x", "y", "z"], "default": "x"},
+                "plane": {"type": "string", "description": "Mirror plane", "enum": ["XY", "XZ", "YZ"], "default": "YZ"},
+                # Hole parameters
+                "diameter": {"type": "number", "description": "Hole diameter", "default": 6},
+                "depth": {"type": "number", "description": "Hole depth", "default": 10},
+                "x": POSITION_PROPERTIES["x"],
+                "y": POSITION_PROPERTIES["y"],
+                # Advanced parameters
+                "name": {"type": "string", "description": "Name for result feature"}
+            },
+            "required": ["operation"]
+        }
+    ),
+    types.Tool(
+        name="part_operations",
+        description="Smart dispatcher for all basic solid and boolean operations (18+ operations)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "operation": {
+                    "type": "string",
+                    "description": "Part operation to perform", 
+                    "enum": [
+                        # Primitive creation (6)
+                        "box", "cylinder", "sphere", "cone", "torus", "wedge",
+                        # Boolean operations (4)
+                        "fuse", "cut", "common", "section",
+                        # Transform operations (4)
+                        "move", "rotate", "scale", "mirror",
+                        # Advanced creation (4)
+                        "loft", "sweep", "extrude", "revolve"
+                    ]
+                },
+                # Primitive parameters
+                "length": {"type": "number", "description": "Box length", "default": 10},
+                "width": {"type": "number", "description": "Box width", "default": 10},
+                "height": {"type": "number", "description": "Box/cylinder height", "default": 10},
+                "radius": {"type": "number", "description": "Sphere/cylinder radius", "default": 5},
+                "radius1": {"type": "number", "description": "Major radius for torus/cone", "default": 10},
+                "radius2": {"type": "number", "description": "Minor radius for torus/cone", "default": 3},
+                # Position parameters
+                **POSITION_PROPERTIES,
+                # Boolean operation parameters
+                "objects": {"type": "array", "items": {"type": "string"}, "description": "Object names for boolean ops"},
+                "base": {"type": "string", "description": "Base object for cut operation"},
+                "tools": {"type": "array", "items": {"type": "string"}, "description": "Tool objects for cut"},
+                # Transform parameters
+                "object_name": {"type": "string", "description": "Object to transform"},
+                "axis": {"type": "string", "description": "Rotation axis", "enum": ["x", "y", "z"], "default": "z"},
+                "angle": {"type": "number", "description": "Rotation angle", "default": 90},
+                "scale_factor": {"type": "number", "description": "Scale factor", "default": 1.5},
+                # Advanced creation parameters
+                "sketches": {"type": "array", "items": {"type": "string"}, "description": "Sketches for loft"},
+                "profile_sketch": {"type": "string", "description": "Profile sketch for sweep"},
+                "path_sketch": {"type": "string", "description": "Path sketch for sweep"},
+                # Naming
+                "name": {"type": "string", "description": "Name for result object"}
+            },
+            "required": ["operation"]
+        }
+    ),
+    types.Tool(
+        name="view_control",
+        description="Smart dispatcher for all view, screenshot, and document operations",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "operation": {
+                    "type": "string",
+                    "description": "View control operation",
+                    "enum": [
+                        # View operations
+                        "screenshot", "set_view", "fit_all", "zoom_in", "zoom_out",
+                        # Document operations  
+                        "create_document", "save_document", "list_objects",
+                        # Selection operations
+                        "select_object", "clear_selection", "get_selection",
+                        # Object visibility
+                        "hide_object", "show_object", "delete_object",
+                        # History operations
+                        "undo", "redo",
+                        # Workbench control
+                        "activate_workbench"
+                    ]
+                },
+                # Screenshot parameters
+                "width": {"type": "integer", "description": "Screenshot width", "default": 800},
+                "height": {"type": "integer", "description": "Screenshot height", "default": 600},
+                # View parameters
+                "view_type": {"type": "string", "description": "View orientation", 
+                             "enum": ["top", "front", "left", "right", "isometric", "axonometric"], 
+                             "default": "isometric"},
+                # Document parameters
+                "document_name": {"type": "string", "description": "Document name", "default": "Unnamed"},
+                "filename": {"type": "string", "description": "File path to save"},
+                # Object parameters
+                "object_name": {"type": "string", "description": "Object name for operations"},
+                # Workbench parameters
+                "workbench_name": {"type": "string", "description": "Workbench name to activate"}
+            },
+            "required": ["operation"]
+        }
+    ),
+    types.Tool(
+        name="execute_python",
+        description="Execute arbitrary Python code in FreeCAD context for power users and advanced operations",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "code": {
+                    "type": "string",
+                    "description": "Python code to execute in FreeCAD context"
+                }
+            },
+            "required": ["code"]
+        }
+    ),
+    types.Tool(
+        name="continue_selection",
+        description="Continue an interactive selection operation after selecting elements in FreeCAD",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "operation_id": {
+                    "type": "string",
+                    "description": "The operation ID from the awaiting_selection response"
+                }
+            },
+            "required": ["operation_id"]
+        }
+    )
+]
+
+ALL_TOOLS = BASE_TOOLS + SMART_DISPATCHER_TOOLS
+
+IS_WINDOWS = platform.system() == "Windows"
+
+# Messages to and from FreeCAD carry a 4-byte big-endian length prefix
+FRAME_HEADER_SIZE = 4
+MAX_FRAME_SIZE = 0xFFFFFF  # 16 MiB, matches the FreeCAD socket server
+
+# Seconds before giving up on FreeCAD, so a stuck workbench can't hang calls
+CONNECT_TIMEOUT = 5.0
+REQUEST_TIMEOUT = 30.0
+
+# Most requests outstanding at FreeCAD at once. It runs them one at a time on
+# its GUI thread, so more only lengthens the queue a timeout has to fail.
+# This also bounds a connection's outbox, so each batch is sent whole in
+# one sendmsg, well under IOV_MAX.
+MAX_IN_FLIGHT = 8
+# FreeCAD can start or quit while the bridge runs; its socket is re-checked
+# for the tool list and status at most this often (seconds)
+SOCKET_CHECK_INTERVAL = 0.25
+# Kernel send/receive buffer size, so a whole screenshot or object listing
+# moves in a few syscalls (Linux caps this at net.core.[rw]mem_max)
+SOCKET_BUFFER_SIZE = 1 << 20
+
+# Windows 10 1803+ FreeCAD also serves a Unix socket here; TCP otherwise
+WINDOWS_SOCKET_PATH = os.path.join(os.environ.get("PROGRAMDATA", "C:\\ProgramData"), "freecad_mcp.sock")
+
+async def connect_to_freecad(socket_path: str) -> socket.socket:
+    """Open a non-blocking connection to the FreeCAD socket server"""
+    loop = asyncio.get_running_loop()
+    if IS_WINDOWS:
+        addresses = [(socket.AF_INET, ('localhost', 23456))]
+        if hasattr(socket, 'AF_UNIX') and os.path.exists(WINDOWS_SOCKET_PATH):
+            addresses.insert(0, (socket.AF_UNIX, WINDOWS_SOCKET_PATH))
+    else:
+        addresses = [(socket.AF_UNIX, socket_path)]
+        
+    for family, address in addresses:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            if family == socket.AF_INET:
+                # Small request/reply messages: don't wait on Nagle/delayed ACK
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            except OSError:
+                pass  # Keep the kernel defaults where the size can't be changed
+            if IS_WINDOWS and family != socket.AF_INET:
+                # The Proactor loop's sock_connect only takes INET sockets;
+                # a local Unix socket connects at once, so block in a thread
+                await loop.run_in_executor(None, sock.connect, address)
+                sock.setblocking(False)
+            else:
+                sock.setblocking(False)
+                await loop.sock_connect(sock, address)
+        except Exception:
+            sock.close()
+            if address == addresses[-1][1]:
+                raise
+            continue  # Fall through to the next address
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+# Replies are read into pooled buffers; a reply too big for one gets its
+# own buffer so the pool's memory stays bounded
+RECV_BUFFER_SIZE = 65536
+RECV_POOL_SIZE = 8
+_recv_pool: list[bytearray] = []
+
+def _acquire_buffer() -> bytearray:
+    return _recv_pool.pop() if _recv_pool else bytearray(RECV_BUFFER_SIZE)
+
+def _release_buffer(buffer: bytearray):
+    if len(buffer) == RECV_BUFFER_SIZE and len(_recv_pool) < RECV_POOL_SIZE:
+        _recv_pool.append(buffer)
+
+class RequestNotSent(ConnectionResetError):
+    """The connection closed before any of the request reached FreeCAD"""
+
+if hasattr(socket.socket, 'sendmsg'):
+    async def write_frames(sock: socket.socket, payloads: list[bytes]):
+        """Send length-prefixed messages"""
+        loop = asyncio.get_running_loop()
+        buffers = []
+        for payload in payloads:
+            buffers += (len(payload).to_bytes(FRAME_HEADER_SIZE, 'big'), payload)
+        # Hand every header and payload to the kernel at once without joining
+        # them; whatever doesn't fit in the send buffer goes out via sock_sendall
+        try:
+            sent = sock.sendmsg(buffers)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError as e:
+            raise RequestNotSent(str(e)) from e
+        for buffer in buffers:
+            if sent >= len(buffer):
+                sent -= len(buffer)
+                continue
+            with memoryview(buffer) as view:
+                await loop.sock_sendall(sock, view[sent:])
+            sent = 0
+else:
+    async def write_frames(sock: socket.socket, payloads: list[bytes]):
+        """Send length-prefixed messages"""
+        # No sendmsg on Windows
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendall(sock, b"".join(
+            part for payload in payloads
+            for part in (len(payload).to_bytes(FRAME_HEADER_SIZE, 'big'), payload)
+        ))
+
+async def _recv_exactly(sock: socket.socket, view: memoryview):
+    """Fill view from the socket, however many reads it takes"""
+    loop = asyncio.get_running_loop()
+    received = 0
+    while received < len(view):
+        count = await loop.sock_recv_into(sock, view[received:])
+        if not count:
+            raise ConnectionResetError("FreeCAD closed the connection")
+        received += count
+
+async def read_frame(sock: socket.socket) -> bytes | bytearray:
+    """Read one length-prefixed message"""
+    buffer = _acquire_buffer()
+    try:
+        with memoryview(buffer) as view:
+            await _recv_exactly(sock, view[:FRAME_HEADER_SIZE])
+            length = int.from_bytes(view[:FRAME_HEADER_SIZE], 'big')
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"FreeCAD reply of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+        if length > len(buffer):
+            # Size known up front: a large reply (e.g. a screenshot) is read
+            # into one buffer of exactly its size, handed over without a copy
+            _release_buffer(buffer)
+            buffer = bytearray(length)
+            with memoryview(buffer) as view:
+                await _recv_exactly(sock, view)
+            return buffer
+        with memoryview(buffer) as view:
+            await _recv_exactly(sock, view[:length])
+            return bytes(view[:length])
+    finally:
+        _release_buffer(buffer)
+
+class FreeCADConnection:
+    """Pipelined connection to the FreeCAD socket server
+    
+    Requests are written back to back without waiting for earlier replies,
+    and requests made while the writer is busy go out together in one send.
+    FreeCAD answers each connection's requests in order, so a background
+    reader hands replies to the waiting callers first in, first out.
+    """
+    
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.closed = False
+        self.outbox = []
+        self.outbox_ready = asyncio.Event()
+        self.pending = collections.deque()
+        self.writer = asyncio.create_task(self._write_requests())
+        self.reader = asyncio.create_task(self._read_replies())
+        self.writer.add_done_callback(self._task_done)
+        self.reader.add_done_callback(self._task_done)
+        
+    @classmethod
+    async def open(cls, socket_path: str) -> "FreeCADConnection":
+        return cls(await connect_to_freecad(socket_path))
+        
+    async def request(self, payload: bytes) -> bytes | bytearray:
+        """Send one command and wait for its reply"""
+        if self.closed:
+            raise RequestNotSent("FreeCAD connection closed")
+        future = asyncio.get_running_loop().create_future()
+        self.outbox.append((payload, future))
+        self.outbox_ready.set()
+        return await future
+        
+    def close(self, error: BaseException | None = None):
+        """Fail every outstanding request and stop the writer and reader"""
+        self.closed = True
+        error = error or ConnectionResetError("FreeCAD connection closed")
+        # Requests still in the outbox were never written and may be resent;
+        # pending ones may already have run in FreeCAD
+        unsent = RequestNotSent("FreeCAD connection closed before the request was sent")
+        for futures, exception in ((self.pending, error), ((f for _, f in self.outbox), unsent)):
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exception)
+        self.pending.clear()
+        self.outbox.clear()
+        self.writer.cancel()
+        self.reader.cancel()
+        
+    def _task_done(self, task: asyncio.Task):
+        # The socket is closed once neither task can still be using it
+        if self.writer.done() and self.reader.done():
+            self.sock.close()
+            
+    async def _write_requests(self):
+        try:
+            while True:
+                await self.outbox_ready.wait()
+                self.outbox_ready.clear()
+                batch, self.outbox = self.outbox, []
+                payloads = []
+                for payload, future in batch:
+                    # Skip callers that gave up before their request went out
+                    if not future.done():
+                        self.pending.append(future)
+                        payloads.append(payload)
+                if payloads:
+                    try:
+                        await write_frames(self.sock, payloads)
+                    except RequestNotSent as e:
+                        # Nothing of this batch went out; its callers may
+                        # resend, unlike those already waiting on replies
+                        for _ in payloads:
+                            future = self.pending.pop()
+                            if not future.done():
+                                future.set_exception(e)
+                        self.close(ConnectionResetError(str(e)))
+                        return
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # A partly written frame leaves the stream unusable
+            self.close(e)
+            
+    async def _read_replies(self):
+        try:
+            while True:
+                reply = await read_frame(self.sock)
+                if not self.pending:
+                    raise ValueError("Unsolicited reply from FreeCAD")
+                future = self.pending.popleft()
+                # A caller that gave up leaves a cancelled future behind
+                if not future.done():
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.close(e)
+
+if msgspec is not None:
+    class ReplyStatus(msgspec.Struct):
+        """Just the top-level "status" of a FreeCAD reply; other keys are skipped"""
+        status: Any = None
+        
+    _status_decoder = msgspec.json.Decoder(ReplyStatus)
+
+# Button-style view_control operations that take no other arguments are
+# sent as commands encoded once here
+PRESET_VIEW_COMMANDS = {
+    operation: _dumps({"tool": "view_control", "args": {"operation": operation}})
+    for operation in ("fit_all", "zoom_in", "zoom_out", "list_objects",
+                      "clear_selection", "get_selection", "undo", "redo")
+}
+
+def encode_command(tool_name: str, args: dict) -> bytes:
+    """Encode one command for FreeCAD"""
+    if tool_name == "view_control" and len(args) == 1:
+        operation = args.get("operation")
+        if isinstance(operation, str) and operation in PRESET_VIEW_COMMANDS:
+            return PRESET_VIEW_COMMANDS[operation]
+    return _dumps({"tool": tool_name, "args": args})
+
+# Raw bytes every selection request reply contains
+SELECTION_MARKER = b'"awaiting_selection"'
+
+def reply_status(reply: bytes | bytearray):
+    """Return the top-level "status" of a JSON reply, or None"""
+    if msgspec is not None:
+        try:
+            return _status_decoder.decode(reply).status
+        except msgspec.MsgspecError:
+            return None  # Not a JSON object
+    try:
+        result = _loads(reply)
+    except ValueError:
+        return None  # Not JSON
+    return result.get("status") if isinstance(result, dict) else None
+
+def _json_text(value) -> str:
+    """Serialize value as a JSON document string"""
+    return _dumps(value).decode('utf-8')
+
+# Stands in for missing tool arguments; shared, so never mutated
+EMPTY_ARGS: dict[str, Any] = {}
+
+# What tool handlers return. Always a list: the MCP server reads a 2-tuple
+# as (content, structured content). It copies the list, so shared results
+# are safe as long as nothing mutates them.
+ToolResult = list[types.ImageContent | types.TextContent]
+
+def text_result(text: str) -> list[types.TextContent]:
+    """Wrap text as a tool call result"""
+    return [types.TextContent(type="text", text=text)]
+
+# Fixed results are built once and shared
+MISSING_OPERATION_ID = text_result("Error: operation_id is required to continue selection")
+
+# FreeCAD returns screenshots as a PNG data URL inside its JSON reply
+SCREENSHOT_DATA_PREFIX = "data:image/png;base64,"
+
+def screenshot_result(response: str) -> ToolResult:
+    """Return a screenshot reply as MCP image content instead of a text blob
+    
+    Errors and anything else unexpected are passed through as text.
+    """
     try:
-        # Import MCP components with correct API
-        import mcp.types as types
-        from mcp.server import NotificationOptions, Server
-        from mcp.server.models import InitializationOptions
-    except ImportError as e:
-        # MCP import failed - exit silently to avoid STDIO corruption
-        sys.exit(1)
+        screenshot = _loads(_loads(response)["result"])
+        image = screenshot["image"]
+        if not image.startswith(SCREENSHOT_DATA_PREFIX):
+            return text_result(response)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return text_result(response)
+    return [
+        types.ImageContent(type="image", data=image[len(SCREENSHOT_DATA_PREFIX):], mimeType="image/png"),
+        types.TextContent(type="text", text=f"Screenshot {screenshot.get('width')}x{screenshot.get('height')}"),
+    ]
 
+# Returned for every call while FreeCAD isn't running, so encoded once
+SOCKET_UNAVAILABLE_ERROR = _json_text({"error": "FreeCAD socket not available. Please start FreeCAD and switch to AI Copilot workbench"})
+
+def _json_escape(value) -> str:
+    """Escape str(value) for use inside a quoted JSON string"""
+    return _json_text(str(value))[1:-1]
+
+# Interactive selection reply; only the %s fields vary per selection
+INTERACTIVE_TEMPLATE = (
+    '{"interactive":true,'
+    '"message":"🎯 Interactive Selection Required\\n\\n%s",'
+    '"operation_id":%s,'
+    '"selection_type":%s,'
+    '"object_name":%s,'
+    '"tool_name":%s,'
+    '"original_args":%s,'
+    '"instructions":"1. Go to FreeCAD and select %s on %s\\n2. Return here and choose an option:"}'
+)
+
+async def main():
+    """Run MCP server for FreeCAD integration"""
     # Create server with freecad naming
-    server = Server("freecad")
+    server = Server(SERVER_NAME)
     
     # Check if FreeCAD is available (cross-platform)
-    if platform.system() == "Windows":
-        socket_path = "localhost:23456"
-        freecad_available = True  # We'll check connection when needed
-    else:
-        socket_path = "/tmp/freecad_mcp.sock"
-        freecad_available = os.path.exists(socket_path)
+    socket_path = "localhost:23456" if IS_WINDOWS else "/tmp/freecad_mcp.sock"
+    socket_checked_at = None
+    socket_exists = False
+    
+    def freecad_available() -> bool:
+        """Whether the FreeCAD socket exists, re-checked at most every SOCKET_CHECK_INTERVAL"""
+        nonlocal socket_checked_at, socket_exists
+        if IS_WINDOWS:
+            return True  # We'll check connection when needed
+        now = time.monotonic()
+        if socket_checked_at is None or now - socket_checked_at >= SOCKET_CHECK_INTERVAL:
+            socket_exists = os.path.exists(socket_path)
+            socket_checked_at = now
+        return socket_exists
+    
+    # One persistent connection to FreeCAD, opened on first use and reopened
+    # when it drops (e.g. FreeCAD restarted). Concurrent tool calls are
+    # pipelined over it rather than waiting for each other's replies.
+    connection = None
+    connect_lock = asyncio.Lock()
+    in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
     
     async def send_to_freecad(tool_name: str, args: dict) -> str:
         """Send command to FreeCAD via socket (cross-platform)"""
+        nonlocal connection, socket_checked_at
+        # FreeCAD known to be down: answer without encoding or connecting
+        if (connection is None or connection.closed) and not freecad_available():
+            return SOCKET_UNAVAILABLE_ERROR
         try:
-            # Create socket connection based on platform
-            if platform.system() == "Windows":
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.connect(('localhost', 23456))
-            else:
-                if not os.path.exists(socket_path):
-                    return json.dumps({"error": "FreeCAD socket not available. Please start FreeCAD and switch to AI Copilot workbench"})
-                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-                sock.connect(socket_path)
+            command = encode_command(tool_name, args)
             
-            # Send command
-            command = json.dumps({"tool": tool_name, "args": args})
-            sock.send(command.encode('utf-8'))
-            
-            # Receive response
-            response = sock.recv(8192).decode('utf-8')
-            sock.close()
+            # Wait here, not in FreeCAD's queue, where a timeout fails them all
+            async with in_flight:
+                for attempt in range(2):
+                    if connection is None or connection.closed:
+                        async with connect_lock:
+                            if connection is None or connection.closed:
+                                # connect() itself reports a missing or dead socket
+                                try:
+                                    connection = await asyncio.wait_for(FreeCADConnection.open(socket_path), CONNECT_TIMEOUT)
+                                except (FileNotFoundError, ConnectionRefusedError, asyncio.TimeoutError):
+                                    # Don't let the cached socket check claim FreeCAD is up
+                                    socket_checked_at = None
+                                    return SOCKET_UNAVAILABLE_ERROR
+                
+                    current = connection
+                    try:
+                        reply = await asyncio.wait_for(current.request(command), REQUEST_TIMEOUT)
+                        break
+                    except asyncio.TimeoutError:
+                        # Next call starts over on a fresh connection; requests
+                        # already written on this one fail without being retried
+                        current.close(TimeoutError("FreeCAD stopped responding"))
+                        return _json_text({"error": f"FreeCAD did not respond within {REQUEST_TIMEOUT:g} seconds"})
+                    except RequestNotSent:
+                        # Never reached FreeCAD, so it gets one retry on a
+                        # fresh connection. Anything that failed after being
+                        # written may have run, and isn't repeated.
+                        if attempt:
+                            raise
             
             # Check if this is a selection workflow response
-            try:
-                result = json.loads(response)
-                if isinstance(result, dict) and result.get("status") == "awaiting_selection":
-                    # Handle interactive selection workflow
-                    return await handle_selection_workflow(tool_name, args, result)
-            except json.JSONDecodeError:
-                pass  # Not JSON, return as-is
+            # Most replies can't be selection requests; skip parsing those
+            if SELECTION_MARKER in reply and reply_status(reply) == "awaiting_selection":
+                # Handle interactive selection workflow
+                return await handle_selection_workflow(tool_name, args, _loads(reply))
             
-            return response
+            return reply.decode('utf-8')
             
         except Exception as e:
-            return json.dumps({"error": f"Socket communication error: {e}"})
+            return _json_text({"error": f"Socket communication error: {e}"})
     
     async def handle_selection_workflow(tool_name: str, original_args: dict, selection_request: dict) -> str:
         """Handle the interactive selection workflow - Claude Code style"""
@@ -82,318 +688,120 @@ async def main():
             operation_id = selection_request.get("operation_id", "")
             
             # Create Claude Code compatible interactive response
-            interactive_response = {
-                "interactive": True,
-                "message": f"🎯 Interactive Selection Required\n\n{message}",
-                "operation_id": operation_id,
-                "selection_type": selection_type,
-                "object_name": object_name,
-                "tool_name": tool_name,
-                "original_args": original_args,
-                "instructions": f"1. Go to FreeCAD and select {selection_type} on {object_name}\n2. Return here and choose an option:"
-            }
-            
-            return json.dumps(interactive_response)
+            return INTERACTIVE_TEMPLATE % (
+                _json_escape(message),
+                _json_text(operation_id),
+                _json_text(selection_type),
+                _json_text(object_name),
+                _json_text(tool_name),
+                _json_text(original_args),
+                _json_escape(selection_type),
+                _json_escape(object_name),
+            )
             
         except Exception as e:
-            return json.dumps({"error": f"Selection workflow error: {e}"})
+            return _json_text({"error": f"Selection workflow error: {e}"})
     
     @server.list_tools()
     async def handle_list_tools() -> list[types.Tool]:
         """List available Phase 1 smart dispatcher tools"""
-        base_tools = [
-            types.Tool(
-                name="check_freecad_connection",
-                description="Check if FreeCAD is running with AI Copilot workbench",
-                inputSchema={
-                    "type": "object",
-                    "properties": {},
-                }
-            ),
-            types.Tool(
-                name="test_echo",
-                description="Test tool that echoes back a message",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "message": {
-                            "type": "string",
-                            "description": "Message to echo back"
-                        }
-                    },
-                    "required": ["message"]
-                }
-            )
-        ]
+        # Smart dispatchers need the FreeCAD socket
+        return ALL_TOOLS if freecad_available() else BASE_TOOLS
+
+    # Only two connection-check replies are possible; build both up front
+    connection_status = {
+        available: text_result(_dumps_indented({
+            "freecad_socket_exists": available,
+            "socket_path": socket_path,
+            "status": "FreeCAD running with AI Copilot workbench" if available 
+                     else "FreeCAD not running. Please start FreeCAD and switch to AI Copilot workbench"
+        }))
+        for available in (True, False)
+    }
+    
+    async def handle_connection_check(name: str, args: dict[str, Any]) -> ToolResult:
+        return connection_status[freecad_available()]
         
-        # Add Phase 1 Smart Dispatchers if socket is available
-        if freecad_available:
-            smart_dispatchers = [
-                types.Tool(
-                    name="partdesign_operations", 
-                    description="⚠️ MODIFIES FreeCAD document: Smart dispatcher for parametric features. Operations like fillet/chamfer require edge selection and will permanently modify the 3D model.",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "operation": {
-                                "type": "string",
-                                "description": "PartDesign operation to perform",
-                                "enum": [
-                                    # Additive features (5)
-                                    "pad", "revolution", "loft", "sweep", "additive_pipe",
-                                    # Subtractive features (2)
-                                    "groove", "subtractive_sweep",
-                                    # Dress-up features (2)
-                                    "fillet", "chamfer",
-                                    # Pattern features (1)
-                                    "mirror",
-                                    # Hole features (3)
-                                    "hole", "counterbore", "countersink"
-                                ]
-                            },
-                            "sketch_name": {"type": "string", "description": "Sketch name for operations"},
-                            "object_name": {"type": "string", "description": "Object name for dress-up operations"},
-                            "feature_name": {"type": "string", "description": "Feature name for pattern operations"},
-                            # Common parameters
-                            "length": {"type": "number", "description": "Length/depth for pad", "default": 10},
-                            "radius": {"type": "number", "description": "Radius for fillet/holes", "default": 1},
-                            "distance": {"type": "number", "description": "Distance for chamfer", "default": 1},
-                            "angle": {"type": "number", "description": "Angle for revolution/draft", "default": 360},
-                            "thickness": {"type": "number", "description": "Thickness value", "default": 2},
-                            # Pattern parameters
-                            "count": {"type": "integer", "description": "Pattern count", "default": 3},
-                            "spacing": {"type": "number", "description": "Pattern spacing", "default": 10},
-                            "axis": {"type": "string", "description": "Axis for patterns", "enum": ["x", "y", "z"], "default": "x"},
-                            "plane": {"type": "string", "description": "Mirror plane", "enum": ["XY", "XZ", "YZ"], "default": "YZ"},
-                            # Hole parameters
-                            "diameter": {"type": "number", "description": "Hole diameter", "default": 6},
-                            "depth": {"type": "number", "description": "Hole depth", "default": 10},
-                            "x": {"type": "number", "description": "X position", "default": 0},
-                            "y": {"type": "number", "description": "Y position", "default": 0},
-                            # Advanced parameters
-                            "name": {"type": "string", "description": "Name for result feature"}
-                        },
-                        "required": ["operation"]
-                    }
-                ),
-                types.Tool(
-                    name="part_operations",
-                    description="Smart dispatcher for all basic solid and boolean operations (18+ operations)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "operation": {
-                                "type": "string",
-                                "description": "Part operation to perform", 
-                                "enum": [
-                                    # Primitive creation (6)
-                                    "box", "cylinder", "sphere", "cone", "torus", "wedge",
-                                    # Boolean operations (4)
-                                    "fuse", "cut", "common", "section",
-                                    # Transform operations (4)
-                                    "move", "rotate", "scale", "mirror",
-                                    # Advanced creation (4)
-                                    "loft", "sweep", "extrude", "revolve"
-                                ]
-                            },
-                            # Primitive parameters
-                            "length": {"type": "number", "description": "Box length", "default": 10},
-                            "width": {"type": "number", "description": "Box width", "default": 10},
-                            "height": {"type": "number", "description": "Box/cylinder height", "default": 10},
-                            "radius": {"type": "number", "description": "Sphere/cylinder radius", "default": 5},
-                            "radius1": {"type": "number", "description": "Major radius for torus/cone", "default": 10},
-                            "radius2": {"type": "number", "description": "Minor radius for torus/cone", "default": 3},
-                            # Position parameters
-                            "x": {"type": "number", "description": "X position", "default": 0},
-                            "y": {"type": "number", "description": "Y position", "default": 0},
-                            "z": {"type": "number", "description": "Z position", "default": 0},
-                            # Boolean operation parameters
-                            "objects": {"type": "array", "items": {"type": "string"}, "description": "Object names for boolean ops"},
-                            "base": {"type": "string", "description": "Base object for cut operation"},
-                            "tools": {"type": "array", "items": {"type": "string"}, "description": "Tool objects for cut"},
-                            # Transform parameters
-                            "object_name": {"type": "string", "description": "Object to transform"},
-                            "axis": {"type": "string", "description": "Rotation axis", "enum": ["x", "y", "z"], "default": "z"},
-                            "angle": {"type": "number", "description": "Rotation angle", "default": 90},
-                            "scale_factor": {"type": "number", "description": "Scale factor", "default": 1.5},
-                            # Advanced creation parameters
-                            "sketches": {"type": "array", "items": {"type": "string"}, "description": "Sketches for loft"},
-                            "profile_sketch": {"type": "string", "description": "Profile sketch for sweep"},
-                            "path_sketch": {"type": "string", "description": "Path sketch for sweep"},
-                            # Naming
-                            "name": {"type": "string", "description": "Name for result object"}
-                        },
-                        "required": ["operation"]
-                    }
-                ),
-                types.Tool(
-                    name="view_control",
-                    description="Smart dispatcher for all view, screenshot, and document operations",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "operation": {
-                                "type": "string",
-                                "description": "View control operation",
-                                "enum": [
-                                    # View operations
-                                    "screenshot", "set_view", "fit_all", "zoom_in", "zoom_out",
-                                    # Document operations  
-                                    "create_document", "save_document", "list_objects",
-                                    # Selection operations
-                                    "select_object", "clear_selection", "get_selection",
-                                    # Object visibility
-                                    "hide_object", "show_object", "delete_object",
-                                    # History operations
-                                    "undo", "redo",
-                                    # Workbench control
-                                    "activate_workbench"
-                                ]
-                            },
-                            # Screenshot parameters
-                            "width": {"type": "integer", "description": "Screenshot width", "default": 800},
-                            "height": {"type": "integer", "description": "Screenshot height", "default": 600},
-                            # View parameters
-                            "view_type": {"type": "string", "description": "View orientation", 
-                                         "enum": ["top", "front", "left", "right", "isometric", "axonometric"], 
-                                         "default": "isometric"},
-                            # Document parameters
-                            "document_name": {"type": "string", "description": "Document name", "default": "Unnamed"},
-                            "filename": {"type": "string", "description": "File path to save"},
-                            # Object parameters
-                            "object_name": {"type": "string", "description": "Object name for operations"},
-                            # Workbench parameters
-                            "workbench_name": {"type": "string", "description": "Workbench name to activate"}
-                        },
-                        "required": ["operation"]
-                    }
-                ),
-                types.Tool(
-                    name="execute_python",
-                    description="Execute arbitrary Python code in FreeCAD context for power users and advanced operations",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "code": {
-                                "type": "string",
-                                "description": "Python code to execute in FreeCAD context"
-                            }
-                        },
-                        "required": ["code"]
-                    }
-                ),
-                types.Tool(
-                    name="continue_selection",
-                    description="Continue an interactive selection operation after selecting elements in FreeCAD",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "operation_id": {
-                                "type": "string",
-                                "description": "The operation ID from the awaiting_selection response"
-                            }
-                        },
-                        "required": ["operation_id"]
-                    }
-                )
-            ]
-            return base_tools + smart_dispatchers
+    async def handle_echo(name: str, args: dict[str, Any]) -> ToolResult:
+        message = args.get("message", "No message provided") if args else "No arguments"
+        return text_result(f"Bridge received: {message}")
         
-        return base_tools
-
-    @server.call_tool()
-    async def handle_call_tool(
-        name: str, arguments: dict[str, Any] | None
-    ) -> list[types.TextContent]:
-        """Handle tool calls with smart dispatcher routing"""
+    async def handle_continue_selection(name: str, args: dict[str, Any]) -> ToolResult:
+        operation_id = args.get("operation_id")
+        if not operation_id:
+            return MISSING_OPERATION_ID
         
-        if name == "check_freecad_connection":
-            status = {
-                "freecad_socket_exists": freecad_available,
-                "socket_path": socket_path,
-                "status": "FreeCAD running with AI Copilot workbench" if freecad_available 
-                         else "FreeCAD not running. Please start FreeCAD and switch to AI Copilot workbench"
-            }
-            return [types.TextContent(
-                type="text",
-                text=json.dumps(status, indent=2)
-            )]
-            
-        elif name == "test_echo":
-            message = arguments.get("message", "No message provided") if arguments else "No arguments"
-            return [types.TextContent(
-                type="text", 
-                text=f"Bridge received: {message}"
-            )]
-            
-        # Handle continue_selection tool
-        elif name == "continue_selection":
-            operation_id = arguments.get("operation_id") if arguments else None
-            if not operation_id:
-                return [types.TextContent(
-                    type="text",
-                    text="Error: operation_id is required to continue selection"
-                )]
-            
-            # Send continuation command to FreeCAD
-            response = await send_to_freecad("continue_selection", {
-                "operation_id": operation_id
-            })
-            
-            return [types.TextContent(
-                type="text",
-                text=response
-            )]
-            
-        # Route smart dispatcher tools to socket with enhanced routing
-        elif name in ["partdesign_operations", "part_operations", 
-                      "view_control", "execute_python"]:
-            args = arguments or {}
-            
-            # Check if this is a continuation from interactive selection
-            if args.get("_continue_from_interactive"):
-                # Extract the original operation details
-                operation_id = args.get("operation_id")
-                tool_name = args.get("tool_name") 
-                original_args = args.get("original_args", {})
-                
-                # Add continuation flag
-                continue_args = {
-                    **original_args,
-                    "_continue_selection": True,
-                    "_operation_id": operation_id
-                }
-                
-                response = await send_to_freecad(tool_name, continue_args)
-            else:
-                response = await send_to_freecad(name, args)
+        # Send continuation command to FreeCAD
+        response = await send_to_freecad("continue_selection", {
+            "operation_id": operation_id
+        })
+        
+        return text_result(response)
+        
+    async def handle_dispatcher(name: str, args: dict[str, Any]) -> ToolResult:
+        """Route smart dispatcher tools to socket with enhanced routing"""
+        # Check if this is a continuation from interactive selection
+        if args.get("_continue_from_interactive"):
+            # Extract the original operation details
+            operation_id = args.get("operation_id")
+            tool_name = args.get("tool_name") 
+            original_args = args.get("original_args", EMPTY_ARGS)
             
-            return [types.TextContent(
-                type="text",
-                text=response
-            )]
+            # Add continuation flag
+            continue_args = {
+                **original_args,
+                "_continue_selection": True,
+                "_operation_id": operation_id
+            }
             
+            response = await send_to_freecad(tool_name, continue_args)
         else:
-            return [types.TextContent(
-                type="text",
-                text=f"Unknown tool: {name}"
-            )]
+            response = await send_to_freecad(name, args)
+            if name == "view_control" and args.get("operation") == "screenshot":
+                return screenshot_result(response)
+        
+        return text_result(response)
+        
+    async def handle_unknown(name: str, args: dict[str, Any]) -> ToolResult:
+        return text_result(f"Unknown tool: {name}")
+        
+    tool_handlers = {
+        "check_freecad_connection": handle_connection_check,
+        "test_echo": handle_echo,
+        "continue_selection": handle_continue_selection,
+        "partdesign_operations": handle_dispatcher,
+        "part_operations": handle_dispatcher,
+        "view_control": handle_dispatcher,
+        "execute_python": handle_dispatcher,
+    }
+    
+    @server.call_tool()
+    async def handle_call_tool(
+        name: str, arguments: dict[str, Any] | None
+    ) -> ToolResult:
+        """Handle tool calls with smart dispatcher routing"""
+        return await tool_handlers.get(name, handle_unknown)(name, arguments or EMPTY_ARGS)
 
+    # Capabilities reflect the handlers registered above, so they can only
+    # be computed here; do it before stdio is opened rather than inside it
+    init_options = InitializationOptions(
+        server_name=SERVER_NAME,
+        server_version=SERVER_VERSION,
+        capabilities=server.get_capabilities(
+            notification_options=NOTIFICATION_OPTIONS,
+            experimental_capabilities={},
+        ),
+    )
+    
     # Run the server
-    import mcp.server.stdio
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="freecad",
-                server_version="2.0.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
-                ),
-            ),
-        )
+        await server.run(read_stream, write_stream, init_options)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        # libuv-based event loop when installed (not available on Windows)
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
\ No newline at end of file